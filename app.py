@@ -6,7 +6,13 @@ from PIL import Image
 from fpdf import FPDF 
 import time
 import os
+import io
 from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
+from shared_cache import SharedCache
+from prefetch import SubjectPrefetch
+from exam_structure import EXAM_STRUCTURE
+from progress_io import build_valid_ids, export_progress, read_progress, validate_progress, apply_progress
 
 # ==========================================
 # 0. 頁面與全域設定
@@ -19,95 +25,6 @@ try:
 except:
     st.set_page_config(page_title="消防考試綜合刷題站", page_icon="📝", layout="wide")
 
-# 考試結構定義 (三層架構)
-EXAM_STRUCTURE = {
-    "消防升官等考": {
-        "icon": "👨‍🚒",
-        "description": "警正、員級晉高員級",
-        "subjects": {
-            "刑法與消防法規": {
-                "file": "questions criminal andfire law.json",
-                "prefix": "Law",
-                "icon": "🚒",
-                "has_handwriting": False
-            },
-            "法學知識與英文": {
-                "file": "questions law and english.json",
-                "prefix": "Eng",
-                "icon": "⚖️",
-                "has_handwriting": False
-            },
-            "國文": {
-                "file": "questions chinese.json",
-                "handwriting_file": "handwriting chinese.json",
-                "prefix": "Chi",
-                "icon": "📖",
-                "has_handwriting": True
-            }
-        }
-    },
-    "警大二技": {
-        "icon": "👮‍♂️",
-        "description": "中央警察大學二年制技術系",
-        "subjects": {
-            "英文": {
-                "file": "cpu_english.json",
-                "prefix": "CpuEng",
-                "icon": "🔤",
-                "has_handwriting": False
-            },
-            "國文與憲法": {
-                "file": "cpu_chi_const.json",
-                "prefix": "CpuCC",
-                "icon": "📜",
-                "has_handwriting": False
-            },
-            "消防法規": {
-                "file": "cpu_fire_law.json",
-                "prefix": "CpuLaw",
-                "icon": "🚒",
-                "has_handwriting": False
-            },
-            "普通化學": {
-                "file": "cpu_chemistry.json",
-                "prefix": "CpuChem",
-                "icon": "🧪",
-                "has_handwriting": False
-            }
-        }
-    },
-    "消防設備士": {
-        "icon": "🧯",
-        "description": "專門職業及技術人員普通考試",
-        "subjects": {
-            "水與化學系統": {
-                "file": "fst_water chemical systems.json",
-                "prefix": "WaterChem",
-                "icon": "💧",
-                "has_handwriting": False
-            },
-            "火災學概要": {
-                "file": "fst_fire science basic.json",
-                "prefix": "FireSci",
-                "icon": "🔥",
-                "has_handwriting": False
-            },
-            "消防法規概要": {
-                "file": "fst_fire law.json",
-                "prefix": "FireLaw",
-                "icon": "📜",
-                "has_handwriting": False
-            },
-            "警報與避難系統": {
-                "file": "fst_alarm evacuationsystems.json",
-                "prefix": "Alarm",
-                "icon": "🔔",
-                "has_handwriting": False
-            }
-        }
-    }
-}
-
 # 初始化 Session State
 if 'current_exam_type' not in st.session_state:
     st.session_state['current_exam_type'] = None
@@ -117,36 +34,68 @@ if 'current_subject' not in st.session_state:
 # ==========================================
 # 1. Google Sheets 資料庫功能
 # ==========================================
+
+# 多副本部署時共用的工作表快照 (設定 SHARED_CACHE_DIR 才啟用)
+@st.cache_resource
+def get_shared_cache():
+    cache_dir = os.environ.get("SHARED_CACHE_DIR")
+    if not cache_dir: return None
+    return SharedCache(cache_dir, profile_ttl=float(os.environ.get("SHARED_CACHE_TTL", 60)))
+
+def read_sheet(conn, fresh=False):
+    # 存檔前需讀最新資料 (fresh=True)，避免蓋掉其他副本剛寫入的內容
+    cache = get_shared_cache()
+    if cache and not fresh:
+        df = cache.get_sheet()
+        if df is not None: return df
+    # 讀取前先記時間，讀取期間若有其他副本存檔，較舊的結果不會蓋掉新快照
+    read_at = time.time()
+    df = conn.read(ttl=0)
+    if cache: cache.put_sheet(df, read_at=read_at)
+    return df
+
+def write_sheet(conn, df):
+    conn.update(data=df)
+    cache = get_shared_cache()
+    if cache: cache.put_sheet(df, read_at=time.time())
+
 def get_user_data(username, prefix):
-    col_fav = f"Fav_{prefix}"
-    col_mis = f"Mis_{prefix}"
+    return get_user_data_all(username, [prefix])[prefix]
+
+# 一次讀取工作表，取出多個科目的收藏/錯題 (供預載使用)
+def get_user_data_all(username, prefixes):
     try:
         conn = st.connection("gsheets", type=GSheetsConnection)
-        df = conn.read(ttl=0)
+        df = read_sheet(conn)
         if df.empty: df = pd.DataFrame(columns=['Username'])
-        
-        expected_cols = ['Username', col_fav, col_mis]
-        for col in expected_cols:
-            if col not in df.columns: df[col] = None 
-
         user_row = df[df['Username'] == username]
-        if not user_row.empty:
-            fav_str = str(user_row.iloc[0][col_fav])
-            mis_str = str(user_row.iloc[0][col_mis])
+    except Exception as e:
+        return {prefix: (set(), set()) for prefix in prefixes}
+
+    result = {}
+    for prefix in prefixes:
+        col_fav = f"Fav_{prefix}"
+        col_mis = f"Mis_{prefix}"
+        try:
+            if user_row.empty:
+                result[prefix] = (set(), set())
+                continue
+            # 欄位各自判斷，只有 Fav 沒有 Mis (或反之) 時仍要讀出已存在的那一欄
+            fav_str = str(user_row.iloc[0][col_fav]) if col_fav in df.columns else 'None'
+            mis_str = str(user_row.iloc[0][col_mis]) if col_mis in df.columns else 'None'
             fav_set = set(json.loads(fav_str)) if fav_str and fav_str not in ['nan', 'None'] else set()
             mis_set = set(json.loads(mis_str)) if mis_str and mis_str not in ['nan', 'None'] else set()
-            return fav_set, mis_set
-        else:
-            return set(), set()
-    except Exception as e:
-        return set(), set()
+            result[prefix] = (fav_set, mis_set)
+        except Exception as e:
+            result[prefix] = (set(), set())
+    return result
 
 def save_user_data(username, prefix, fav_set, mis_set):
     col_fav = f"Fav_{prefix}"
     col_mis = f"Mis_{prefix}"
     try:
         conn = st.connection("gsheets", type=GSheetsConnection)
-        df = conn.read(ttl=0)
+        df = read_sheet(conn, fresh=True)
         
         fav_json = json.dumps(list(fav_set))
         mis_json = json.dumps(list(mis_set))
@@ -164,7 +113,7 @@ def save_user_data(username, prefix, fav_set, mis_set):
             new_row = pd.DataFrame([new_data])
             df = pd.concat([df, new_row], ignore_index=True)
             
-        conn.update(data=df)
+        write_sheet(conn, df)
     except Exception as e:
         st.warning(f"自動存檔失敗：{e}")
 
@@ -173,7 +122,7 @@ def get_exam_dates(username):
     col_dates = "Settings_ExamDates"
     try:
         conn = st.connection("gsheets", type=GSheetsConnection)
-        df = conn.read(ttl=0)
+        df = read_sheet(conn)
         if df.empty: return {}
         
         if col_dates not in df.columns: return {}
@@ -191,7 +140,7 @@ def save_exam_dates(username, dates_dict):
     col_dates = "Settings_ExamDates"
     try:
         conn = st.connection("gsheets", type=GSheetsConnection)
-        df = conn.read(ttl=0)
+        df = read_sheet(conn, fresh=True)
         
         json_data = json.dumps(dates_dict, default=str)
         
@@ -204,7 +153,7 @@ def save_exam_dates(username, dates_dict):
             new_row = pd.DataFrame([new_data])
             df = pd.concat([df, new_row], ignore_index=True)
             
-        conn.update(data=df)
+        write_sheet(conn, df)
         st.toast("📅 日期設定已更新！")
     except Exception as e:
         st.error(f"存檔失敗：{e}")
@@ -278,6 +227,27 @@ def create_pdf(questions, title):
 def load_questions(filename):
     with open(filename, 'r', encoding='utf-8') as f: return json.load(f)
 
+# --- 背景預載：進入考試類型 (階段 2) 時先載入各科進度與題庫 ---
+# 預載的進度超過此秒數就不再使用，避免其他分頁/裝置在此期間的存檔被舊資料蓋掉
+PREFETCH_MAX_AGE = float(os.environ.get("SHARED_CACHE_TTL", 60))
+
+@st.cache_resource
+def get_prefetch_pool():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+def start_prefetch(exam_name, username):
+    prefetch = st.session_state.get('prefetch')
+    if prefetch and prefetch.matches(exam_name, username): return
+    cancel_prefetch()
+    st.session_state['prefetch'] = SubjectPrefetch(
+        get_prefetch_pool(), exam_name, username, EXAM_STRUCTURE[exam_name]['subjects'].values(),
+        load_questions, get_user_data_all, PREFETCH_MAX_AGE
+    )
+
+def cancel_prefetch():
+    prefetch = st.session_state.pop('prefetch', None)
+    if prefetch: prefetch.cancel()
+
 # ==========================================
 # 4. 核心判斷邏輯 (單選 / 多選 / 爭議題)
 # ==========================================
@@ -545,6 +515,7 @@ def run_quiz_mode(config, username, fav_set, mis_set):
 
 # 階段 1: 選擇考試類型 (Exam Type)
 if st.session_state['current_exam_type'] is None:
+    cancel_prefetch()
     st.title(f"👋 歡迎回來，{st.session_state['username']}")
     
     # --- 優化後的介面：卡片式倒數計時器 (調整字體與顏色) ---
@@ -645,6 +616,35 @@ if st.session_state['current_exam_type'] is None:
                         save_exam_dates(st.session_state['username'], user_dates)
                         st.rerun()
 
+    # 4. 管理員：全體進度備份 / 匯入 (secrets.toml 中的 admins 名單)
+    if st.session_state['username'] in st.secrets.get("admins", []):
+        with st.expander("🗄️ 全體進度備份 / 匯入 (管理員)", expanded=False):
+            backup_fmt = st.radio("檔案格式", ["parquet", "csv"], horizontal=True, key="backup_fmt")
+            if st.button("📤 產生備份檔"):
+                try:
+                    with st.spinner("匯出中..."):
+                        conn = st.connection("gsheets", type=GSheetsConnection)
+                        buf = io.BytesIO()
+                        export_progress(read_sheet(conn, fresh=True), buf, backup_fmt)
+                    st.download_button("📥 下載備份", buf.getvalue(), f"progress_{date.today()}.{backup_fmt}")
+                except Exception as e:
+                    st.error(f"匯出失敗：{e}")
+
+            st.markdown("---")
+            upload = st.file_uploader("匯入備份檔 (會取代檔案中使用者的進度)", type=["parquet", "csv"])
+            if upload is not None:
+                try:
+                    valid_ids = build_valid_ids(load_questions)
+                    fmt = "parquet" if upload.name.lower().endswith(".parquet") else "csv"
+                    long_df, dropped = validate_progress(read_progress(upload, fmt), valid_ids)
+                    st.caption(f"有效資料 {len(long_df)} 筆（{long_df['Username'].nunique()} 位使用者），丟棄 {dropped} 筆")
+                    if st.button("📥 確認匯入"):
+                        conn = st.connection("gsheets", type=GSheetsConnection)
+                        write_sheet(conn, apply_progress(read_sheet(conn, fresh=True), long_df, valid_ids))
+                        st.success("✅ 匯入完成！")
+                except Exception as e:
+                    st.error(f"匯入失敗：{e}")
+
     st.markdown("---")
     st.subheader("請選擇您的刷題題庫：")
     
@@ -662,6 +662,7 @@ if st.session_state['current_exam_type'] is None:
 elif st.session_state['current_subject'] is None:
     curr_exam_name = st.session_state['current_exam_type']
     curr_exam_info = EXAM_STRUCTURE[curr_exam_name]
+    start_prefetch(curr_exam_name, st.session_state['username'])
     
     st.button("⬅️ 回考試首頁", on_click=lambda: st.session_state.update({'current_exam_type': None}))
     st.title(f"{curr_exam_info['icon']} {curr_exam_name} - 科目選擇")
@@ -688,7 +689,14 @@ else:
 
     if 'current_fav' not in st.session_state or st.session_state.get('loaded_subject') != curr_subj_name:
         with st.spinner(f"正在載入 {curr_subj_name} 的進度..."):
-            f_data, m_data = get_user_data(st.session_state['username'], config['prefix'])
+            prefetch = st.session_state.get('prefetch')
+            if prefetch and prefetch.username == st.session_state['username']:
+                prefetch.focus(config)
+                f_data, m_data = prefetch.user_data(config['prefix'], get_user_data)
+                prefetch.wait_bank(config['file'])
+                if config.get('handwriting_file'): prefetch.wait_bank(config['handwriting_file'])
+            else:
+                f_data, m_data = get_user_data(st.session_state['username'], config['prefix'])
             st.session_state['current_fav'] = f_data
             st.session_state['current_mis'] = m_data
             st.session_state['loaded_subject'] = curr_subj_name
@@ -0,0 +1,88 @@
+# 考試結構定義 (三層架構)
+EXAM_STRUCTURE = {
+    "消防升官等考": {
+        "icon": "👨‍🚒",
+        "description": "警正、員級晉高員級",
+        "subjects": {
+            "刑法與消防法規": {
+                "file": "questions criminal andfire law.json",
+                "prefix": "Law",
+                "icon": "🚒",
+                "has_handwriting": False
+            },
+            "法學知識與英文": {
+                "file": "questions law and english.json",
+                "prefix": "Eng",
+                "icon": "⚖️",
+                "has_handwriting": False
+            },
+            "國文": {
+                "file": "questions chinese.json",
+                "handwriting_file": "handwriting chinese.json",
+                "prefix": "Chi",
+                "icon": "📖",
+                "has_handwriting": True
+            }
+        }
+    },
+    "警大二技": {
+        "icon": "👮‍♂️",
+        "description": "中央警察大學二年制技術系",
+        "subjects": {
+            "英文": {
+                "file": "cpu_english.json",
+                "prefix": "CpuEng",
+                "icon": "🔤",
+                "has_handwriting": False
+            },
+            "國文與憲法": {
+                "file": "cpu_chi_const.json",
+                "prefix": "CpuCC",
+                "icon": "📜",
+                "has_handwriting": False
+            },
+            "消防法規": {
+                "file": "cpu_fire_law.json",
+                "prefix": "CpuLaw",
+                "icon": "🚒",
+                "has_handwriting": False
+            },
+            "普通化學": {
+                "file": "cpu_chemistry.json",
+                "prefix": "CpuChem",
+                "icon": "🧪",
+                "has_handwriting": False
+            }
+        }
+    },
+    "消防設備士": {
+        "icon": "🧯",
+        "description": "專門職業及技術人員普通考試",
+        "subjects": {
+            "水與化學系統": {
+                "file": "fst_water chemical systems.json",
+                "prefix": "WaterChem",
+                "icon": "💧",
+                "has_handwriting": False
+            },
+            "火災學概要": {
+                "file": "fst_fire science basic.json",
+                "prefix": "FireSci",
+                "icon": "🔥",
+                "has_handwriting": False
+            },
+            "消防法規概要": {
+                "file": "fst_fire law.json",
+                "prefix": "FireLaw",
+                "icon": "📜",
+                "has_handwriting": False
+            },
+            "警報與避難系統": {
+                "file": "fst_alarm evacuationsystems.json",
+                "prefix": "Alarm",
+                "icon": "🔔",
+                "has_handwriting": False
+            }
+        }
+    }
+}
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import wait
+
+# ==========================================
+# 背景預載：進入考試類型 (階段 2) 時先載入各科進度與題庫
+# ==========================================
+# 進度讀取最先排入執行緒池，題庫解析排在後面。
+# 若進入科目時讀取尚未開始 (仍在排隊)，就取消它並直接同步讀取，不會比原本更慢。
+
+
+class SubjectPrefetch:
+    def __init__(self, pool, exam_name, username, subjects, load_bank, load_user_data_all, max_age, clock=time.time):
+        self.exam_name = exam_name
+        self.username = username
+        self.max_age = max_age
+        self.clock = clock
+        self.started_at = clock()
+
+        subjects = list(subjects)
+        self.users = pool.submit(load_user_data_all, username, [s['prefix'] for s in subjects])
+        self.banks = {}
+        for subj_config in subjects:
+            for key in ('file', 'handwriting_file'):
+                if key in subj_config: self.banks[subj_config[key]] = pool.submit(load_bank, subj_config[key])
+
+    def is_fresh(self):
+        # 超過 max_age 的進度不再使用，避免其他分頁/裝置在此期間的存檔被舊資料蓋掉
+        return self.clock() - self.started_at < self.max_age
+
+    def matches(self, exam_name, username):
+        return self.exam_name == exam_name and self.username == username and self.is_fresh()
+
+    def cancel(self):
+        # 已開始執行的工作無法中斷，只會取消尚在排隊的
+        for fut in list(self.banks.values()) + [self.users]: fut.cancel()
+
+    def focus(self, config):
+        # 已選定科目：取消其他科目尚在排隊的題庫解析，讓目前科目優先
+        keep = {config['file'], config.get('handwriting_file')}
+        for filename in [f for f in self.banks if f not in keep]:
+            self.banks.pop(filename).cancel()
+
+    def user_data(self, prefix, load_user_data):
+        # 每個科目的預載結果只用一次，之後重新進入科目會讀取最新資料
+        if self.is_fresh() and not self.users.cancel():
+            data = self.users.result().pop(prefix, None)
+            if data is not None: return data
+        return load_user_data(self.username, prefix)
+
+    def wait_bank(self, filename):
+        # 尚在排隊就取消，由呼叫端直接解析；已開始則等待完成，之後直接命中快取
+        fut = self.banks.get(filename)
+        if fut is not None and not fut.cancel(): wait([fut])
@@ -0,0 +1,188 @@
+import argparse
+import io
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from exam_structure import EXAM_STRUCTURE
+
+# ==========================================
+# 全體使用者進度 匯出 / 匯入 (備份與搬移用)
+# ==========================================
+# 長表格式，每列一筆：
+#   Username | Prefix   | Kind | QuestionId | Value
+#   收藏/錯題: 科目 prefix | fav / mis | 題目 id | (空)
+#   考試日期: 考試名稱     | date      | (空)    | YYYY-MM-DD
+
+LONG_COLUMNS = ['Username', 'Prefix', 'Kind', 'QuestionId', 'Value']
+LONG_SCHEMA = pa.schema([(col, pa.string()) for col in LONG_COLUMNS])
+DATES_COLUMN = "Settings_ExamDates"
+SET_COLUMNS = {'fav': 'Fav_', 'mis': 'Mis_'}
+
+
+def load_bank_json(filename):
+    with open(filename, 'r', encoding='utf-8') as f: return json.load(f)
+
+def build_valid_ids(load_bank=load_bank_json):
+    # {prefix: {str(id): 原始 id}}，手寫題的「已練」也記在同一個 Fav 欄位
+    valid_ids = {}
+    for exam_info in EXAM_STRUCTURE.values():
+        for subj_config in exam_info['subjects'].values():
+            ids = valid_ids.setdefault(subj_config['prefix'], {})
+            for key in ('file', 'handwriting_file'):
+                if key in subj_config:
+                    for q in load_bank(subj_config[key]): ids[str(q['id'])] = q['id']
+    return valid_ids
+
+def parse_cell(value):
+    text = str(value)
+    if not text or text in ['nan', 'None']: return None
+    try: return json.loads(text)
+    except ValueError: return None
+
+# --- 匯出 ---
+def iter_progress_chunks(sheet_df, chunk_size=500):
+    # 每次處理 chunk_size 位使用者，避免一次展開整張表
+    set_cols = [c for c in sheet_df.columns if any(c.startswith(p) for p in SET_COLUMNS.values())]
+    kind_of = {prefix: kind for kind, prefix in SET_COLUMNS.items()}
+
+    for start in range(0, len(sheet_df), chunk_size):
+        rows = []
+        for _, user_row in sheet_df.iloc[start:start + chunk_size].iterrows():
+            username = str(user_row['Username'])
+            for col in set_cols:
+                ids = parse_cell(user_row[col])
+                if not ids: continue
+                kind = kind_of[col[:4]]
+                for qid in ids: rows.append([username, col[4:], kind, str(qid), None])
+            if DATES_COLUMN in sheet_df.columns:
+                dates = parse_cell(user_row[DATES_COLUMN]) or {}
+                for exam_name, date_str in dates.items(): rows.append([username, exam_name, 'date', None, str(date_str)])
+        yield pd.DataFrame(rows, columns=LONG_COLUMNS)
+
+def export_progress(sheet_df, out, fmt, chunk_size=500):
+    # out 可為檔案路徑或二進位檔案物件 (例如 io.BytesIO)
+    if fmt == 'parquet':
+        with pq.ParquetWriter(out, LONG_SCHEMA) as writer:
+            for chunk in iter_progress_chunks(sheet_df, chunk_size):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=LONG_SCHEMA, preserve_index=False))
+        return
+
+    f = open(out, 'w', encoding='utf-8', newline='') if isinstance(out, str) else io.TextIOWrapper(out, encoding='utf-8', newline='')
+    try:
+        pd.DataFrame(columns=LONG_COLUMNS).to_csv(f, index=False)
+        for chunk in iter_progress_chunks(sheet_df, chunk_size): chunk.to_csv(f, index=False, header=False)
+    finally:
+        if isinstance(out, str): f.close()
+        else: f.flush(); f.detach()
+
+# --- 匯入 ---
+def read_progress(src, fmt):
+    if fmt == 'parquet': long_df = pd.read_parquet(src)
+    else: long_df = pd.read_csv(src, dtype=str, keep_default_na=False)
+
+    missing = [c for c in LONG_COLUMNS if c not in long_df.columns]
+    if missing: raise ValueError(f"缺少欄位：{', '.join(missing)}")
+    long_df = long_df[LONG_COLUMNS].astype(object)
+    return long_df.where(long_df.notna() & (long_df != ''), None)
+
+def validate_progress(long_df, valid_ids):
+    # 丟棄題庫中已不存在的題目 id、未知的科目與格式錯誤的日期，回傳 (保留的資料, 丟棄筆數)
+    def is_valid(row):
+        if not row['Username']: return False
+        if row['Kind'] in SET_COLUMNS:
+            return row['QuestionId'] in valid_ids.get(row['Prefix'], {})
+        if row['Kind'] == 'date':
+            try: datetime.strptime(str(row['Value']), "%Y-%m-%d")
+            except ValueError: return False
+            return bool(row['Prefix'])
+        return False
+
+    if long_df.empty: return long_df, 0
+    mask = long_df.apply(is_valid, axis=1)
+    return long_df[mask].drop_duplicates(), int((~mask).sum())
+
+def apply_progress(sheet_df, long_df, valid_ids):
+    # 檔案中出現的使用者，其收藏/錯題/日期全部以檔案內容取代；其他使用者不受影響
+    df = sheet_df.copy()
+    if 'Username' not in df.columns: df['Username'] = None
+
+    prefixes = set(long_df.loc[long_df['Kind'].isin(list(SET_COLUMNS)), 'Prefix'])
+    for prefix in prefixes:
+        for col_prefix in SET_COLUMNS.values():
+            if f"{col_prefix}{prefix}" not in df.columns: df[f"{col_prefix}{prefix}"] = None
+    if DATES_COLUMN not in df.columns: df[DATES_COLUMN] = None
+    target_cols = [c for c in df.columns if any(c.startswith(p) for p in SET_COLUMNS.values())] + [DATES_COLUMN]
+    # 尚未有人填寫的欄位從 Sheets 讀回來是全 NaN 的 float64，需先轉成 object 才能寫入 JSON 字串
+    df[target_cols] = df[target_cols].astype(object)
+
+    new_rows = []
+    for username, user_df in long_df.groupby('Username', sort=False):
+        values = dict.fromkeys(target_cols)
+        for (prefix, kind), group in user_df[user_df['Kind'].isin(list(SET_COLUMNS))].groupby(['Prefix', 'Kind']):
+            ids = [valid_ids[prefix][qid] for qid in group['QuestionId']]
+            values[f"{SET_COLUMNS[kind]}{prefix}"] = json.dumps(ids)
+        dates = user_df[user_df['Kind'] == 'date']
+        if not dates.empty: values[DATES_COLUMN] = json.dumps(dict(zip(dates['Prefix'], dates['Value'])), default=str)
+
+        mask = df['Username'].astype(str) == username
+        if mask.any():
+            for col, value in values.items(): df.loc[mask, col] = value
+        else:
+            new_rows.append({'Username': username, **values})
+
+    if new_rows: df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+    return df
+
+def detect_format(path, fmt=None):
+    if fmt: return fmt
+    return 'parquet' if path.lower().endswith('.parquet') else 'csv'
+
+# ==========================================
+# 命令列介面 (於專案目錄執行，讀取 .streamlit/secrets.toml)
+#   python progress_io.py export backup.parquet
+#   python progress_io.py import backup.csv --dry-run
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="全體使用者進度匯出 / 匯入")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_exp = sub.add_parser('export', help="匯出所有使用者的收藏/錯題/考試日期")
+    p_exp.add_argument('path')
+    p_exp.add_argument('--format', choices=['parquet', 'csv'])
+    p_exp.add_argument('--chunk-size', type=int, default=500)
+    p_imp = sub.add_parser('import', help="驗證後一次寫回 Google Sheets")
+    p_imp.add_argument('path')
+    p_imp.add_argument('--format', choices=['parquet', 'csv'])
+    p_imp.add_argument('--dry-run', action='store_true', help="只驗證，不寫入")
+    args = parser.parse_args(argv)
+
+    import streamlit as st
+    from streamlit_gsheets import GSheetsConnection
+    from shared_cache import SharedCache
+
+    conn = st.connection("gsheets", type=GSheetsConnection)
+    cache = SharedCache(os.environ["SHARED_CACHE_DIR"]) if os.environ.get("SHARED_CACHE_DIR") else None
+    sheet_df = conn.read(ttl=0)
+    fmt = detect_format(args.path, args.format)
+
+    if args.command == 'export':
+        export_progress(sheet_df, args.path, fmt, args.chunk_size)
+        print(f"已匯出 {len(sheet_df)} 位使用者的進度至 {args.path}")
+        return
+
+    valid_ids = build_valid_ids()
+    long_df, dropped = validate_progress(read_progress(args.path, fmt), valid_ids)
+    print(f"有效資料 {len(long_df)} 筆，丟棄 {dropped} 筆 (題目已不存在或格式錯誤)")
+    if args.dry_run: return
+
+    new_df = apply_progress(sheet_df, long_df, valid_ids)
+    conn.update(data=new_df)
+    if cache: cache.put_sheet(new_df)
+    print(f"已寫入 {long_df['Username'].nunique()} 位使用者的進度")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import io
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+# ==========================================
+# 跨程序共用快取 (多個 Streamlit 副本共用)
+# ==========================================
+# 目錄結構：
+#   <cache_dir>/profiles.sqlite3  Google Sheets 使用者資料快照 (含 TTL)
+
+
+class SharedCache:
+    def __init__(self, cache_dir, profile_ttl=60):
+        self.cache_dir = cache_dir
+        self.profile_ttl = profile_ttl
+        self.db_path = os.path.join(cache_dir, "profiles.sqlite3")
+        os.makedirs(cache_dir, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS sheet_snapshot ("
+                    "name TEXT PRIMARY KEY, payload TEXT NOT NULL, updated_at REAL NOT NULL)"
+                )
+        finally:
+            conn.close()
+
+    def _execute(self, sql, params=()):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    # --- 使用者資料：整張工作表的快照，TTL 內直接共用 ---
+    def get_sheet(self, name="users"):
+        try:
+            rows = self._execute("SELECT payload, updated_at FROM sheet_snapshot WHERE name = ?", (name,))
+        except sqlite3.Error:
+            return None
+        if not rows or time.time() - rows[0][1] >= self.profile_ttl:
+            return None
+        return pd.read_json(io.StringIO(rows[0][0]), orient="split", dtype=False, convert_dates=False)
+
+    def put_sheet(self, df, name="users", read_at=None):
+        # read_at 為開始讀取 Sheets 的時間；只有比現有快照新的資料才會寫入
+        if read_at is None: read_at = time.time()
+        try:
+            self._execute(
+                "INSERT INTO sheet_snapshot (name, payload, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at "
+                "WHERE excluded.updated_at > sheet_snapshot.updated_at",
+                (name, df.to_json(orient="split", index=False, force_ascii=False), read_at)
+            )
+        except sqlite3.Error:
+            self.invalidate_sheet(name)
+
+    def invalidate_sheet(self, name="users"):
+        try: self._execute("DELETE FROM sheet_snapshot WHERE name = ?", (name,))
+        except sqlite3.Error: pass
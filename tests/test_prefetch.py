@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from prefetch import SubjectPrefetch
+
+SUBJECTS = [
+    {'file': 'law.json', 'prefix': 'Law'},
+    {'file': 'chi.json', 'handwriting_file': 'hw.json', 'prefix': 'Chi'},
+]
+
+
+def load_user_data_all(username, prefixes):
+    return {prefix: ({f"{prefix}-fav"}, set()) for prefix in prefixes}
+
+def load_user_data(username, prefix):
+    return {'fresh-read'}, set()
+
+
+class Clock:
+    def __init__(self): self.now = 1000.0
+    def __call__(self): return self.now
+
+
+def test_progress_read_is_submitted_before_banks():
+    submitted = []
+    class RecordingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            submitted.append('users' if fn is load_user_data_all else args[0])
+            return super().submit(fn, *args)
+
+    with RecordingPool(1) as pool:
+        SubjectPrefetch(pool, '考試', 'amy', SUBJECTS, lambda f: [], load_user_data_all, 60)
+    assert submitted == ['users', 'law.json', 'chi.json', 'hw.json']
+
+
+def test_prefetched_sets_used_once_per_prefix():
+    with ThreadPoolExecutor(2) as pool:
+        prefetch = SubjectPrefetch(pool, '考試', 'amy', SUBJECTS, lambda f: [], load_user_data_all, 60)
+        prefetch.users.result()
+        assert prefetch.user_data('Law', load_user_data) == ({'Law-fav'}, set())
+        assert prefetch.user_data('Law', load_user_data) == ({'fresh-read'}, set())
+        assert prefetch.user_data('Chi', load_user_data) == ({'Chi-fav'}, set())
+
+
+def test_stale_prefetch_falls_back_to_fresh_read():
+    clock = Clock()
+    with ThreadPoolExecutor(2) as pool:
+        prefetch = SubjectPrefetch(pool, '考試', 'amy', SUBJECTS, lambda f: [], load_user_data_all, 60, clock=clock)
+        prefetch.users.result()
+        assert prefetch.matches('考試', 'amy')
+
+        clock.now += 60
+        assert not prefetch.matches('考試', 'amy')
+        assert prefetch.user_data('Law', load_user_data) == ({'fresh-read'}, set())
+
+
+def test_queued_read_is_cancelled_and_read_directly():
+    release = threading.Event()
+    with ThreadPoolExecutor(1) as pool:
+        pool.submit(release.wait)  # 佔住唯一的 worker，預載工作只能排隊
+        prefetch = SubjectPrefetch(pool, '考試', 'amy', SUBJECTS, lambda f: [], load_user_data_all, 60)
+
+        assert prefetch.user_data('Law', load_user_data) == ({'fresh-read'}, set())
+        assert prefetch.users.cancelled()
+        prefetch.wait_bank('law.json')
+        assert prefetch.banks['law.json'].cancelled()
+        release.set()
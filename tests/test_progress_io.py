@@ -0,0 +1,73 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from progress_io import LONG_COLUMNS, apply_progress, export_progress, read_progress, validate_progress
+
+
+def test_apply_progress_fills_all_nan_columns():
+    # Sheets 讀回未填寫的欄位是全 NaN 的 float64
+    sheet = pd.DataFrame({'Username': ['bob'], 'Fav_Law': [np.nan], 'Mis_Law': [np.nan], 'Settings_ExamDates': [np.nan]})
+    long_df = pd.DataFrame([
+        ['bob', 'Law', 'mis', '11301', None],
+        ['bob', '警大二技', 'date', None, '2027-03-01'],
+    ], columns=LONG_COLUMNS)
+
+    result = apply_progress(sheet, long_df, {'Law': {'11301': 11301}})
+    row = result[result['Username'] == 'bob'].iloc[0]
+    assert row['Mis_Law'] == '[11301]'
+    assert row['Fav_Law'] is None
+    assert row['Settings_ExamDates'] == '{"\\u8b66\\u5927\\u4e8c\\u6280": "2027-03-01"}'
+
+
+VALID_IDS = {'Law': {'11301': 11301}, 'Chi': {'CHI11301': 'CHI11301', '7': 7}}
+
+def source_sheet():
+    return pd.DataFrame({
+        'Username': ['amy'],
+        'Fav_Law': ['[11301, 999999]'],
+        'Mis_Chi': ['["CHI11301", 7, "CHI_GONE"]'],
+        'Fav_Old': ['[1]'],
+        'Settings_ExamDates': ['{"警大二技": "2027-03-01", "其他考試": "明年"}'],
+    })
+
+def round_trip(fmt):
+    buf = io.BytesIO()
+    export_progress(source_sheet(), buf, fmt, chunk_size=1)
+    buf.seek(0)
+    return validate_progress(read_progress(buf, fmt), VALID_IDS)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_round_trip_drops_invalid_rows_and_restores_id_types(fmt):
+    long_df, dropped = round_trip(fmt)
+    # 999999、CHI_GONE 已不在題庫，Old 為未知科目，"明年" 不是日期
+    assert dropped == 4
+
+    target = pd.DataFrame({'Username': ['carl'], 'Fav_Law': ['[11301]'], 'Settings_ExamDates': ['{"消防設備士": "2027-01-01"}']})
+    result = apply_progress(target, long_df, VALID_IDS)
+    amy = result[result['Username'] == 'amy'].iloc[0]
+    assert json.loads(amy['Fav_Law']) == [11301]
+    assert json.loads(amy['Mis_Chi']) == ['CHI11301', 7]
+    assert json.loads(amy['Settings_ExamDates']) == {'警大二技': '2027-03-01'}
+    assert 'Fav_Old' not in result.columns
+
+
+def test_user_absent_from_file_keeps_columns():
+    long_df, _ = round_trip('csv')
+    target = pd.DataFrame({
+        'Username': ['carl', 'amy'],
+        'Fav_Law': ['[11301]', '[1]'],
+        'Mis_Chi': ['["CHI11301"]', None],
+        'Settings_ExamDates': ['{"消防設備士": "2027-01-01"}', None],
+    })
+
+    result = apply_progress(target, long_df, VALID_IDS)
+    carl = result[result['Username'] == 'carl'].iloc[0]
+    assert carl['Fav_Law'] == '[11301]'
+    assert carl['Mis_Chi'] == '["CHI11301"]'
+    assert carl['Settings_ExamDates'] == '{"消防設備士": "2027-01-01"}'
+    assert json.loads(result[result['Username'] == 'amy'].iloc[0]['Fav_Law']) == [11301]
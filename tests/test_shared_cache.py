@@ -0,0 +1,29 @@
+import pandas as pd
+
+import shared_cache
+from shared_cache import SharedCache
+
+
+def test_sheet_snapshot_expires_after_ttl(tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path), profile_ttl=60)
+    monkeypatch.setattr(shared_cache.time, 'time', lambda: 1000.0)
+    cache.put_sheet(pd.DataFrame({'Username': ['amy'], 'Fav_Law': ['[1]']}))
+
+    monkeypatch.setattr(shared_cache.time, 'time', lambda: 1059.0)
+    assert cache.get_sheet().to_dict('records') == [{'Username': 'amy', 'Fav_Law': '[1]'}]
+
+    monkeypatch.setattr(shared_cache.time, 'time', lambda: 1060.0)
+    assert cache.get_sheet() is None
+
+
+def test_older_read_does_not_replace_newer_snapshot(tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path), profile_ttl=60)
+    monkeypatch.setattr(shared_cache.time, 'time', lambda: 1010.0)
+
+    # 存檔寫入 (t=1005) 之後，才完成一個 t=1000 開始的慢速讀取
+    cache.put_sheet(pd.DataFrame({'Username': ['amy'], 'Mis_Law': ['[1, 2]']}), read_at=1005.0)
+    cache.put_sheet(pd.DataFrame({'Username': ['amy'], 'Mis_Law': ['[1]']}), read_at=1000.0)
+    assert cache.get_sheet()['Mis_Law'].tolist() == ['[1, 2]']
+
+    cache.put_sheet(pd.DataFrame({'Username': ['amy'], 'Mis_Law': ['[]']}), read_at=1008.0)
+    assert cache.get_sheet()['Mis_Law'].tolist() == ['[]']